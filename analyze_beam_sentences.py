@@ -13,6 +13,11 @@ from collections import defaultdict, Counter
 from datetime import datetime
 from typing import Dict, List, Tuple
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class BeamSearchSentenceAnalyzer:
     """Phân tích sentences từ kết quả beam search"""
@@ -31,10 +36,12 @@ class BeamSearchSentenceAnalyzer:
         })
     
     def load_beam_results(self, json_file: str) -> Dict:
-        """Đọc file JSON kết quả beam search"""
+        """Đọc file JSON kết quả beam search (orjson nhanh hơn 2-5x nếu có)"""
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # Đọc bytes + parser C của orjson cho các file beam search nhiều MB
+            with open(json_file, 'rb') as f:
+                raw = f.read()
+            data = orjson.loads(raw) if orjson is not None else json.loads(raw)
             print(f"✅ Loaded beam search results from: {json_file}")
             print(f"   Total paths: {data.get('total_paths_found', 0)}")
             print(f"   Search config: beam_width={data.get('search_config', {}).get('beam_width', 'N/A')}")
@@ -42,7 +49,7 @@ class BeamSearchSentenceAnalyzer:
         except FileNotFoundError:
             print(f"❌ File not found: {json_file}")
             return {}
-        except json.JSONDecodeError as e:
+        except ValueError as e:  # json.JSONDecodeError / orjson.JSONDecodeError
             print(f"❌ JSON decode error: {e}")
             return {}
     
@@ -57,30 +64,36 @@ class BeamSearchSentenceAnalyzer:
         # Reset data
         self.sentence_stats.clear()
         
-        # Process each path
-        for path_idx, path in enumerate(beam_data['paths']):
+        # Process each path — bind local để tránh tra attribute lặp lại
+        # trong vòng lặp nóng, và duyệt node_details một lượt thay vì
+        # build list sentence_nodes trung gian
+        sentence_stats = self.sentence_stats
+        for path in beam_data['paths']:
             path_score = path.get('score', 0.0)
-            node_details = path.get('node_details', [])
-            
-            # Find sentence nodes in this path
-            sentence_nodes = [
-                node for node in node_details 
-                if node.get('type', '').lower() == 'sentence'
-            ]
-            
-            # Update stats for each sentence in this path
-            for sentence_node in sentence_nodes:
-                sentence_id = sentence_node.get('id', '')
-                sentence_text = sentence_node.get('text', '').strip()
-                
+            node_details = path.get('node_details')
+            if not node_details:
+                continue
+
+            for node in node_details:
+                # Short-circuit trên ký tự đầu trước khi so sánh cả chuỗi
+                node_type = node.get('type', '')
+                if not node_type or node_type[0] not in 'sS' \
+                        or node_type.lower() != 'sentence':
+                    continue
+
+                sentence_id = node.get('id', '')
+                sentence_text = node.get('text', '').strip()
+
                 if sentence_id and sentence_text:
-                    stats = self.sentence_stats[sentence_id]
-                    
+                    stats = sentence_stats[sentence_id]
+
                     # Update statistics
                     stats['frequency'] += 1
                     stats['total_score'] += path_score
-                    stats['max_score'] = max(stats['max_score'], path_score)
-                    stats['min_score'] = min(stats['min_score'], path_score)
+                    if path_score > stats['max_score']:
+                        stats['max_score'] = path_score
+                    if path_score < stats['min_score']:
+                        stats['min_score'] = path_score
                     stats['paths_count'] += 1
                     stats['sentence_text'] = sentence_text
                     stats['sentence_id'] = sentence_id
@@ -141,19 +154,35 @@ class BeamSearchSentenceAnalyzer:
             f.write(f"Total Unique Sentences: {len(ranked_sentences)}\n")
             f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
             
-            # Summary statistics
+            # Summary statistics (gom trong MỘT lượt duyệt thay vì 6 lần
+            # max/min/sum trên hai list trung gian)
             if ranked_sentences:
-                frequencies = [stats['frequency'] for _, stats in ranked_sentences]
-                avg_scores = [stats['avg_score'] for _, stats in ranked_sentences]
-                
+                max_freq = min_freq = ranked_sentences[0][1]['frequency']
+                max_avg = min_avg = ranked_sentences[0][1]['avg_score']
+                sum_freq = sum_avg = 0.0
+                for _, stats in ranked_sentences:
+                    freq = stats['frequency']
+                    avg = stats['avg_score']
+                    if freq > max_freq:
+                        max_freq = freq
+                    elif freq < min_freq:
+                        min_freq = freq
+                    if avg > max_avg:
+                        max_avg = avg
+                    elif avg < min_avg:
+                        min_avg = avg
+                    sum_freq += freq
+                    sum_avg += avg
+                count = len(ranked_sentences)
+
                 f.write("📈 SUMMARY STATISTICS:\n")
                 f.write("-" * 40 + "\n")
-                f.write(f"  Max frequency: {max(frequencies)}\n")
-                f.write(f"  Min frequency: {min(frequencies)}\n")
-                f.write(f"  Avg frequency: {sum(frequencies)/len(frequencies):.1f}\n")
-                f.write(f"  Max avg_score: {max(avg_scores):.3f}\n")
-                f.write(f"  Min avg_score: {min(avg_scores):.3f}\n")
-                f.write(f"  Overall avg_score: {sum(avg_scores)/len(avg_scores):.3f}\n\n")
+                f.write(f"  Max frequency: {max_freq}\n")
+                f.write(f"  Min frequency: {min_freq}\n")
+                f.write(f"  Avg frequency: {sum_freq/count:.1f}\n")
+                f.write(f"  Max avg_score: {max_avg:.3f}\n")
+                f.write(f"  Min avg_score: {min_avg:.3f}\n")
+                f.write(f"  Overall avg_score: {sum_avg/count:.3f}\n\n")
             
             # Detailed ranking
             f.write("🏆 RANKED SENTENCES:\n")
@@ -226,10 +255,10 @@ def find_latest_beam_file(output_dir: str = "output") -> str:
         ]
         if not beam_files:
             return ""
-        
-        # Sort by timestamp in filename
-        beam_files.sort(reverse=True)
-        latest_file = os.path.join(output_dir, beam_files[0])
+
+        # Chỉ cần file mới nhất theo timestamp trong tên — max O(n),
+        # không cần sort cả danh sách
+        latest_file = os.path.join(output_dir, max(beam_files))
         print(f"🔍 Found latest beam search file: {latest_file}")
         return latest_file
     except FileNotFoundError:
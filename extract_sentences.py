@@ -8,8 +8,25 @@ Tự động tìm file beam search mới nhất và extract sentences
 
 import os
 import sys
+import json
 from analyze_beam_sentences import BeamSearchSentenceAnalyzer, find_latest_beam_file
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _count_paths(file):
+    """Đọc một file beam search và trả về số paths (chạy được trong worker)"""
+    try:
+        with open(file, 'rb') as f:
+            raw = f.read()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        return data.get('total_paths_found', len(data.get('paths', [])))
+    except Exception:
+        return -1
+
 def main():
     print("🎯 EXTRACT SENTENCES FROM BEAM SEARCH")
     print("="*50)
@@ -42,18 +59,20 @@ def main():
         all_files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
         
         # Try to find file with more than 1 path
+        # Mỗi file độc lập (đọc + decode JSON) nên scan song song bằng
+        # process pool khi có nhiều file; map giữ nguyên thứ tự mtime
         input_file = None
-        for file in all_files:
-            try:
-                import json
-                with open(file, 'r') as f:
-                    data = json.load(f)
-                paths_count = data.get('total_paths_found', len(data.get('paths', [])))
-                if paths_count > 1:  # Prefer files with multiple paths
-                    input_file = file
-                    break
-            except:
-                continue
+        if len(all_files) > 4:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor() as executor:
+                path_counts = list(executor.map(_count_paths, all_files, chunksize=8))
+        else:
+            path_counts = [_count_paths(file) for file in all_files]
+
+        for file, paths_count in zip(all_files, path_counts):
+            if paths_count > 1:  # Prefer files with multiple paths
+                input_file = file
+                break
         
         # Fallback to most recent file if no multi-path file found
         if not input_file:
@@ -105,9 +124,10 @@ def main():
     print(f"\n💾 Sentences extracted and saved to:")
     print(f"   {simple_file}")
     
-    # Also show statistics
+    # Also show statistics (ranked theo frequency giảm dần nên max là phần
+    # tử đầu — một pass sum là đủ)
     total_sentences = len(ranked_sentences)
-    max_freq = max(stats['frequency'] for _, stats in ranked_sentences)
+    max_freq = ranked_sentences[0][1]['frequency']
     avg_freq = sum(stats['frequency'] for _, stats in ranked_sentences) / total_sentences
     
     print(f"\n📊 Statistics:")
@@ -15,8 +15,16 @@ from datetime import datetime
 
 
 class Path:
-    """Đại diện cho một đường đi trong đồ thị"""
-    
+    """Đại diện cho một đường đi trong đồ thị
+
+    __slots__ cố định tập attribute: mỗi instance khỏi mang __dict__
+    (beam search tạo/copy hàng nghìn Path) và truy cập path.nodes trong
+    các vòng lặp nóng đi thẳng vào slot thay vì qua dict lookup.
+    """
+
+    __slots__ = ("nodes", "edges", "score", "claim_words", "path_words",
+                 "entities_visited")
+
     def __init__(self, nodes: List[str], edges: List[Tuple[str, str, str]] = None, score: float = 0.0):
         self.nodes = nodes  # Danh sách node IDs
         self.edges = edges or []  # Danh sách (from_node, to_node, relation)
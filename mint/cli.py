@@ -7,6 +7,7 @@ Command line interface for MINT TextGraph library
 """
 
 import argparse
+import logging
 import sys
 import os
 from pathlib import Path
@@ -262,6 +263,15 @@ def main():
     if args.quiet and args.verbose:
         print("Error: Cannot use --quiet and --verbose together")
         sys.exit(1)
+
+    # Configure logging: debug messages chỉ hiển thị khi --verbose
+    logging.basicConfig(format="%(message)s")
+    if args.verbose:
+        logging.getLogger('mint').setLevel(logging.DEBUG)
+    elif args.quiet:
+        logging.getLogger('mint').setLevel(logging.ERROR)
+    else:
+        logging.getLogger('mint').setLevel(logging.INFO)
     
     if args.disable_statistics:
         args.enable_statistics = False
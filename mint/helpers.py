@@ -7,7 +7,10 @@ Helper functions for CLI and text processing
 """
 
 import json
+import logging
+import mmap
 import os
+import re
 import sys
 from pathlib import Path
 import matplotlib.pyplot as plt
@@ -15,6 +18,25 @@ import py_vncorenlp
 from dotenv import load_dotenv
 from .text_graph import TextGraph
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional - fallback về json chuẩn
+
+logger = logging.getLogger('mint')
+
+# Compiled once: case-insensitive scan tránh phải lower() toàn bộ context
+_BANHCUON_RE = re.compile(r'bánh\s*cuốn', re.IGNORECASE)
+
+_DOTENV_LOADED = False
+
+def _ensure_dotenv():
+    """Load file .env đúng một lần cho cả process (tránh I/O lặp lại)"""
+    global _DOTENV_LOADED
+    if not _DOTENV_LOADED:
+        load_dotenv()
+        _DOTENV_LOADED = True
+
 def detect_device():
     """Automatically detect and configure optimal device (GPU/CPU)"""
     try:
@@ -73,8 +95,8 @@ def get_optimized_config_for_device(device_info, base_config):
 
 def load_config():
     """Load configuration from .env file with defaults"""
-    load_dotenv()
-    
+    _ensure_dotenv()
+
     config = {
         # Semantic Similarity defaults (PCA removed)
         'similarity_threshold': float(os.getenv('DEFAULT_SIMILARITY_THRESHOLD', '0.85')),
@@ -156,13 +178,12 @@ def apply_device_optimizations(args, device_info, verbose=False):
     # Set technical flags
     args.disable_faiss = not optimized_config['use_faiss']
     
-    if verbose:
-        optimization_type = "GPU" if device_info['use_gpu_optimizations'] else "CPU"
-        print(f"🔧 {optimization_type} optimizations applied (full embeddings - no PCA):")
-        print(f"  Similarity threshold: {args.similarity_threshold}")
-        print(f"  Top-K: {args.top_k}")
-        print(f"  Use FAISS: {not args.disable_faiss}")
-        print(f"  Embedding dimensions: 768 (full PhoBERT)")
+    optimization_type = "GPU" if device_info['use_gpu_optimizations'] else "CPU"
+    logger.debug("🔧 %s optimizations applied (full embeddings - no PCA):", optimization_type)
+    logger.debug("  Similarity threshold: %s", args.similarity_threshold)
+    logger.debug("  Top-K: %s", args.top_k)
+    logger.debug("  Use FAISS: %s", not args.disable_faiss)
+    logger.debug("  Embedding dimensions: 768 (full PhoBERT)")
 
 def validate_inputs(args):
     """Validate and extract input data from arguments"""
@@ -171,24 +192,35 @@ def validate_inputs(args):
     
     if args.demo:
         context, claim = load_demo_data()
-        if args.verbose:
-            demo_name = "Bánh cuốn Thụy Khuê" if "bánh cuốn" in context.lower() else "SAWACO"
-            print(f"📋 Using demo data ({demo_name} example)")
+        if logger.isEnabledFor(logging.DEBUG):
+            demo_name = "Bánh cuốn Thụy Khuê" if _BANHCUON_RE.search(context) else "SAWACO"
+            logger.debug("📋 Using demo data (%s example)", demo_name)
     
     elif args.input_file:
         if not os.path.exists(args.input_file):
             raise ValueError(f"Input file not found: {args.input_file}")
         
         try:
-            with open(args.input_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
+            if orjson is not None:
+                # mmap + orjson: parser đọc thẳng từ page cache, không copy
+                # toàn bộ file vào một str Python trung gian. orjson không
+                # nhận mmap trực tiếp nên bọc qua memoryview (vẫn zero-copy)
+                with open(args.input_file, 'rb') as f:
+                    if os.fstat(f.fileno()).st_size == 0:
+                        # mmap từ chối file rỗng; báo lỗi JSON như json.load
+                        raise ValueError(f"Invalid JSON format in {args.input_file}")
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        data = orjson.loads(memoryview(mm))
+            else:
+                with open(args.input_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+
             context = data.get('context', '')
             claim = data.get('claim', '')
-            
+
             if not context or not claim:
                 raise ValueError("Input file must contain 'context' and 'claim' fields")
-                
+
         except json.JSONDecodeError:
             raise ValueError(f"Invalid JSON format in {args.input_file}")
     
@@ -199,14 +231,18 @@ def validate_inputs(args):
     else:
         raise ValueError("Must provide either --demo, --input-file, or both --context and --claim")
     
-    if not context.strip() or not claim.strip():
+    # Strip một lần duy nhất (tránh hai lần cấp phát chuỗi O(N))
+    context = context.strip()
+    claim = claim.strip()
+
+    if not context or not claim:
         raise ValueError("Context and claim cannot be empty")
-    
+
     # Auto-detect device and apply optimizations
     device_info = detect_device()
     apply_device_optimizations(args, device_info, args.verbose)
-    
-    return context.strip(), claim.strip(), device_info
+
+    return context, claim, device_info
 
 def setup_vncorenlp(vncorenlp_path, verbose=False, auto_download=True):
     """Setup VnCoreNLP model with automatic download if needed"""
@@ -221,9 +257,8 @@ def setup_vncorenlp(vncorenlp_path, verbose=False, auto_download=True):
     
     if not (os.path.exists(jar_path) and os.path.exists(models_path)):
         if auto_download:
-            if verbose:
-                print(f"  VnCoreNLP not found at: {vncorenlp_path}")
-                print(f"  Auto-downloading VnCoreNLP...")
+            logger.debug("  VnCoreNLP not found at: %s", vncorenlp_path)
+            logger.debug("  Auto-downloading VnCoreNLP...")
             try:
                 vncorenlp_path = download_vncorenlp(vncorenlp_path, verbose)
             except Exception as e:
@@ -232,14 +267,12 @@ def setup_vncorenlp(vncorenlp_path, verbose=False, auto_download=True):
             raise RuntimeError(f"VnCoreNLP not found at: {vncorenlp_path}")
     
     try:
-        if verbose:
-            print(f"  Loading VnCoreNLP from: {vncorenlp_path}")
-        
+        logger.debug("  Loading VnCoreNLP from: %s", vncorenlp_path)
+
         model = py_vncorenlp.VnCoreNLP(save_dir=vncorenlp_path)
-        
-        if verbose:
-            print("  ✅ VnCoreNLP loaded successfully")
-        
+
+        logger.debug("  ✅ VnCoreNLP loaded successfully")
+
         return model
     
     except Exception as e:
@@ -248,18 +281,15 @@ def setup_vncorenlp(vncorenlp_path, verbose=False, auto_download=True):
 def process_text_data(model, context, claim, verbose=False):
     """Process context and claim with VnCoreNLP"""
     try:
-        if verbose:
-            print("  Processing context...")
+        logger.debug("  Processing context...")
         context_sentences = model.annotate_text(context)
-        
-        if verbose:
-            print("  Processing claim...")
+
+        logger.debug("  Processing claim...")
         claim_sentences = model.annotate_text(claim)
-        
-        if verbose:
-            print(f"  ✅ Processed {len(context_sentences)} context sentences")
-            print(f"  ✅ Processed {len(claim_sentences)} claim sentences")
-        
+
+        logger.debug("  ✅ Processed %d context sentences", len(context_sentences))
+        logger.debug("  ✅ Processed %d claim sentences", len(claim_sentences))
+
         return context_sentences, claim_sentences
     
     except Exception as e:
@@ -292,65 +322,53 @@ def build_complete_graph(context, claim, context_sentences, claim_sentences, arg
     # Configure POS filtering (mặc định bật, có thể tắt bằng --disable-pos-filtering)
     if getattr(args, 'disable_pos_filtering', False):
         text_graph.set_pos_filtering(enable=False)
-        if args.verbose:
-            print("  ⚠️ POS filtering disabled - all words will be included")
+        logger.debug("  ⚠️ POS filtering disabled - all words will be included")
     else:
         # POS filtering được bật mặc định, có thể tùy chỉnh tags
         custom_pos_tags = None
         if hasattr(args, 'pos_tags') and args.pos_tags:
             custom_pos_tags = [tag.strip() for tag in args.pos_tags.split(',')]
         text_graph.set_pos_filtering(enable=True, custom_pos_tags=custom_pos_tags)
-        if args.verbose:
-            print(f"  ✅ POS filtering enabled. Using tags: {text_graph.important_pos_tags}")
-    
+        logger.debug("  ✅ POS filtering enabled. Using tags: %s", text_graph.important_pos_tags)
+
     # Build basic graph
-    if args.verbose:
-        print("  Building basic graph structure...")
+    logger.debug("  Building basic graph structure...")
     text_graph.build_from_vncorenlp_output(context_sentences, claim, claim_sentences)
-    
+
     # Entity extraction
     if not args.disable_entities:
-        if args.verbose:
-            print("  Extracting entities with OpenAI...")
+        logger.debug("  Extracting entities with OpenAI...")
         try:
             entity_nodes = text_graph.extract_and_add_entities(context, context_sentences)
-            if args.verbose:
-                print(f"  ✅ Added {len(entity_nodes)} entity nodes")
+            logger.debug("  ✅ Added %d entity nodes", len(entity_nodes))
         except Exception as e:
-            if args.verbose:
-                print(f"  ⚠️ Entity extraction failed: {e}")
-    
+            logger.debug("  ⚠️ Entity extraction failed: %s", e)
+
     # Semantic similarity (without PCA)
     if not args.disable_semantic:
-        if args.verbose:
-            print("  Building semantic similarity edges (full embeddings - no PCA)...")
+        logger.debug("  Building semantic similarity edges (full embeddings - no PCA)...")
         try:
             use_faiss = not args.disable_faiss
-            
+
             edges_added = text_graph.build_semantic_similarity_edges(
                 use_faiss=use_faiss
             )
-            if args.verbose:
-                print(f"  ✅ Added {edges_added} semantic edges")
+            logger.debug("  ✅ Added %s semantic edges", edges_added)
         except Exception as e:
-            if args.verbose:
-                print(f"  ⚠️ Semantic similarity failed: {e}")
-    
+            logger.debug("  ⚠️ Semantic similarity failed: %s", e)
+
     # Auto-save graph if enabled
     if getattr(args, 'auto_save_graph', True):
         try:
             auto_save_path = getattr(args, 'auto_save_path', 'output/graph_auto_{timestamp}.gexf')
             saved_path = auto_save_graph(text_graph, auto_save_path, args.verbose)
-            if args.verbose:
-                print(f"  💾 Graph auto-saved to: {saved_path}")
+            logger.debug("  💾 Graph auto-saved to: %s", saved_path)
         except Exception as e:
-            if args.verbose:
-                print(f"  ⚠️ Auto-save failed: {e}")
-    
+            logger.debug("  ⚠️ Auto-save failed: %s", e)
+
     # Beam Search for path finding (optional)
     if getattr(args, 'beam_search', False):
-        if args.verbose:
-            print("  🎯 Running beam search to find paths from claim to sentences...")
+        logger.debug("  🎯 Running beam search to find paths from claim to sentences...")
         try:
             beam_width = getattr(args, 'beam_width', 10)
             max_depth = getattr(args, 'beam_max_depth', 6)
@@ -367,27 +385,25 @@ def build_complete_graph(context, claim, context_sentences, claim_sentences, arg
             if paths:
                 # Export results
                 json_file, summary_file = text_graph.export_beam_search_results(
-                    paths, 
+                    paths,
                     output_dir=export_dir
                 )
-                
-                # Print statistics
-                if args.verbose:
+
+                # Log statistics (chỉ tính khi DEBUG được bật)
+                if logger.isEnabledFor(logging.DEBUG):
                     stats = text_graph.analyze_paths_quality(paths)
-                    print(f"  📊 Beam search results:")
-                    print(f"    Found {stats['total_paths']} paths")
-                    print(f"    Avg score: {stats['avg_score']:.3f}")
-                    print(f"    Avg length: {stats['avg_length']:.1f} nodes")
-                    print(f"    Paths to sentences: {stats['paths_to_sentences']}")
-                    print(f"    Paths through entities: {stats['paths_through_entities']}")
-                    print(f"    Files saved: {json_file}, {summary_file}")
+                    logger.debug("  📊 Beam search results:")
+                    logger.debug("    Found %d paths", stats['total_paths'])
+                    logger.debug("    Avg score: %.3f", stats['avg_score'])
+                    logger.debug("    Avg length: %.1f nodes", stats['avg_length'])
+                    logger.debug("    Paths to sentences: %d", stats['paths_to_sentences'])
+                    logger.debug("    Paths through entities: %d", stats['paths_through_entities'])
+                    logger.debug("    Files saved: %s, %s", json_file, summary_file)
             else:
-                if args.verbose:
-                    print("  ⚠️ No paths found from claim to sentences")
-                    
+                logger.debug("  ⚠️ No paths found from claim to sentences")
+
         except Exception as e:
-            if args.verbose:
-                print(f"  ⚠️ Beam search failed: {e}")
+            logger.debug("  ⚠️ Beam search failed: %s", e)
     
     return text_graph
 
@@ -503,9 +519,8 @@ def save_outputs(text_graph, args):
     # Save JSON data
     if getattr(args, 'export_json', None):
         try:
-            json_data = text_graph.export_to_json()
-            with open(args.export_json, 'w', encoding='utf-8') as f:
-                f.write(json_data)
+            with open(args.export_json, 'wb') as f:
+                text_graph.export_to_json_stream(f)
             outputs_saved.append(f"JSON: {args.export_json}")
         except Exception as e:
             print(f"⚠️ Failed to save JSON: {e}")
@@ -567,12 +582,10 @@ def download_vncorenlp(target_dir="vncorenlp", verbose=False):
     models_path = os.path.join(target_dir, "models")
     
     if os.path.exists(jar_path) and os.path.exists(models_path):
-        if verbose:
-            print(f"✅ VnCoreNLP already exists at: {target_dir}")
+        logger.debug("✅ VnCoreNLP already exists at: %s", target_dir)
         return target_dir
-    
-    if verbose:
-        print(f"📥 Downloading VnCoreNLP to: {target_dir}")
+
+    logger.debug("📥 Downloading VnCoreNLP to: %s", target_dir)
     
     # Create directory if it doesn't exist
     os.makedirs(target_dir, exist_ok=True)
@@ -581,10 +594,9 @@ def download_vncorenlp(target_dir="vncorenlp", verbose=False):
         # Use py_vncorenlp's built-in download function
         import py_vncorenlp
         py_vncorenlp.download_model(save_dir=target_dir)
-        
-        if verbose:
-            print("  ✅ VnCoreNLP downloaded successfully!")
-        
+
+        logger.debug("  ✅ VnCoreNLP downloaded successfully!")
+
         return target_dir
         
     except Exception as e:
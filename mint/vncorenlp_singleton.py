@@ -0,0 +1,28 @@
+"""
+Singleton cho VnCoreNLP model
+
+Mỗi instance py_vncorenlp.VnCoreNLP khởi động một JVM riêng (mất vài giây
+và ~500MB RAM), nên khi nhiều pipeline chạy trong cùng một Python process
+thì chỉ nên boot model đúng một lần và dùng chung.
+"""
+
+import os
+
+import py_vncorenlp
+
+_model = None
+
+
+def get_model(save_dir="vncorenlp"):
+    """
+    Trả về VnCoreNLP model dùng chung, khởi tạo lazy ở lần gọi đầu tiên.
+
+    VnCoreNLP đổi working directory khi load nên sau khi khởi tạo phải
+    khôi phục lại cwd như các script vẫn làm.
+    """
+    global _model
+    if _model is None:
+        original_cwd = os.getcwd()
+        _model = py_vncorenlp.VnCoreNLP(save_dir=os.path.abspath(save_dir))
+        os.chdir(original_cwd)
+    return _model
@@ -1,15 +1,61 @@
 import json
 import py_vncorenlp
 from mint.text_graph import TextGraph
+from mint.vncorenlp_singleton import get_model
+import math
 import os
 from datetime import datetime
-import statistics
+import numpy as np
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    from rapidfuzz import fuzz as _rf_fuzz
+except ImportError:
+    _rf_fuzz = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _count_unique_codes(codes_sorted, n_texts):
+        """
+        Đếm tần suất text từ mảng code (path_idx * n_texts + text_idx) đã
+        sort: một vòng lặp compiled duy nhất vừa khử trùng lặp vừa đếm,
+        khỏi cấp phát mảng trung gian của np.unique
+        """
+        freqs = np.zeros(n_texts, dtype=np.int64)
+        prev = np.int64(-1)
+        for c in codes_sorted:
+            if c != prev:
+                freqs[c % n_texts] += 1
+                prev = c
+        return freqs
+
+# Bảng translate dựng sẵn cho bước đổi _ thành space ở output
+_UNDERSCORE_TO_SPACE = str.maketrans({'_': ' '})
 
 # IMPROVED ENTITY MATCHING FUNCTIONS
+
+# Cache segmentation theo entity string: cùng một entity xuất hiện ở nhiều
+# sentence (và nhiều sample) nhưng kết quả segment không phụ thuộc sentence,
+# nên chỉ cần gọi JVM đúng một lần cho mỗi entity
+_entity_seg_cache = {}
+
 def segment_entity_with_vncorenlp(entity, model):
     """
     Segment entity sử dụng VnCoreNLP để match với segmented text
     """
+    cached = _entity_seg_cache.get(entity)
+    if cached is not None:
+        return cached
+
     try:
         result = model.annotate_text(entity)
         segmented_words = []
@@ -19,55 +65,80 @@ def segment_entity_with_vncorenlp(entity, model):
                 segmented_words.append(token["wordForm"])
         
         segmented_entity = "_".join(segmented_words)
-        return segmented_entity
-        
+
     except Exception as e:
         # Fallback: simple space to underscore replacement
-        return entity.replace(" ", "_")
+        segmented_entity = entity.replace(" ", "_")
 
-def improved_entity_matching(entity, sentence_text, model=None):
+    _entity_seg_cache[entity] = segmented_entity
+    return segmented_entity
+
+# Tập ký tự alphabet của mỗi entity, dùng cho bước lọc rẻ trước khi quét
+_entity_chars_cache = {}
+
+def _entity_alpha_chars(entity_lower):
+    chars = _entity_chars_cache.get(entity_lower)
+    if chars is None:
+        chars = frozenset(c for c in entity_lower if c.isalpha())
+        _entity_chars_cache[entity_lower] = chars
+    return chars
+
+def improved_entity_matching(entity, sentence_text, segmented_entity=None,
+                             sentence_lower=None, sentence_charset=None):
     """
     Improved entity matching với support cho segmented text
+
+    segmented_entity: kết quả segment_entity_with_vncorenlp đã lowercase,
+    được caller tính MỘT lần cho mỗi entity thay vì mỗi (entity, sentence).
+    sentence_lower: bản lowercase của sentence_text do caller cache sẵn,
+    tránh cấp phát lại cùng một string cho mỗi entity.
+    sentence_charset: frozenset các ký tự của sentence_lower, dùng để loại
+    sớm các entity chắc chắn không xuất hiện mà không cần quét substring.
     """
     entity_lower = entity.lower()
-    sentence_lower = sentence_text.lower()
-    
+    if sentence_lower is None:
+        sentence_lower = sentence_text.lower()
+
+    # Lọc rẻ O(1): entity dài hơn sentence, hoặc chứa ký tự không hề có
+    # trong sentence, thì không thể match — bỏ qua luôn cả 4 method
+    if len(entity_lower) > len(sentence_lower):
+        return False
+    if sentence_charset is not None:
+        if not _entity_alpha_chars(entity_lower).issubset(sentence_charset):
+            return False
+
     # Method 1: Direct matching
     if entity_lower in sentence_lower:
         return True
-    
+
     # Method 2: Simple space->underscore replacement
     entity_simple_seg = entity.replace(" ", "_").lower()
     if entity_simple_seg in sentence_lower:
         return True
-    
-    # Method 3: VnCoreNLP segmentation
-    if model:
-        try:
-            entity_vncorenlp_seg = segment_entity_with_vncorenlp(entity, model).lower()
-            if entity_vncorenlp_seg in sentence_lower:
-                return True
-        except:
-            pass
-    
+
+    # Method 3: VnCoreNLP segmentation (đã được segment sẵn ở caller)
+    if segmented_entity and segmented_entity in sentence_lower:
+        return True
+
     # Method 4: Fuzzy matching cho partial matches
     entity_words = entity.split()
     if len(entity_words) > 1:
+        # RapidFuzz (C extension) nếu có: token-set matching chạy trong C
+        # thay vì vòng lặp substring thuần Python cho từng từ
+        if _rf_fuzz is not None:
+            return _rf_fuzz.partial_token_set_ratio(
+                entity_lower, sentence_lower, score_cutoff=85) >= 85
+
         all_words_found = True
         for word in entity_words:
-            word_variants = [
-                word.lower(),
-                word.replace(" ", "_").lower()
-            ]
-            
-            word_found = any(variant in sentence_lower for variant in word_variants)
+            word_found = word.lower() in sentence_lower
             if not word_found:
                 all_words_found = False
                 break
-        
+
         if all_words_found:
             return True
-    
+
     return False
 
 def improved_add_entities_to_graph(text_graph, entities, context_sentences, model):
@@ -76,26 +147,82 @@ def improved_add_entities_to_graph(text_graph, entities, context_sentences, mode
     """
     entity_nodes_added = []
     total_connections = 0
-    
+
+    # Chuẩn bị node + segmentation đúng một lần cho mỗi entity
+    entity_info = []  # (entity, entity_node, segmented_entity)
     for entity in entities:
-        # Thêm entity node
         entity_node = text_graph.add_entity_node(entity)
         entity_nodes_added.append(entity_node)
-        
-        connections_made = 0
-        # Tìm các sentences có chứa entity này
-        for sent_idx, sentence_node in text_graph.sentence_nodes.items():
-            sentence_text = text_graph.graph.nodes[sentence_node]['text']
-            
-            # SỬ DỤNG IMPROVED MATCHING
-            if improved_entity_matching(entity, sentence_text, model):
-                text_graph.connect_entity_to_sentence(entity_node, sentence_node)
-                connections_made += 1
+
+        # Segment entity đúng một lần (kết quả không phụ thuộc sentence)
+        segmented_entity = None
+        if model:
+            try:
+                segmented_entity = segment_entity_with_vncorenlp(entity, model).lower()
+            except:
+                pass
+        entity_info.append((entity, entity_node, segmented_entity))
+
+    # Lowercase mỗi sentence đúng một lần cho cả vòng entity; trước đây mỗi
+    # (entity, sentence) lại cấp phát thêm một bản lowercase của cùng string
+    graph_nodes = text_graph.graph.nodes
+    sent_cache = []
+    for sent_idx, sentence_node in text_graph.sentence_nodes.items():
+        sentence_text = graph_nodes[sentence_node]['text']
+        sentence_lower = sentence_text.lower()
+        sent_cache.append((sent_idx, sentence_node, sentence_text,
+                           sentence_lower, frozenset(sentence_lower)))
+    connections = [0] * len(entity_info)
+
+    # Bind method một lần thay vì tra attribute trong vòng lặp trong cùng
+    connect_entity = text_graph.connect_entity_to_sentence
+
+    if ahocorasick is not None and entity_info:
+        # Gom mọi biến thể (lowercase, space->underscore, VnCoreNLP seg) của
+        # tất cả entity vào MỘT automaton Aho-Corasick, rồi quét mỗi sentence
+        # đúng một lần: O(S·L + hits) thay vì O(E·S) lần quét substring
+        automaton = ahocorasick.Automaton()
+        for eid, (entity, _node, segmented_entity) in enumerate(entity_info):
+            variants = {entity.lower(), entity.replace(" ", "_").lower()}
+            if segmented_entity:
+                variants.add(segmented_entity)
+            for variant in variants:
+                if variant:
+                    automaton.add_word(variant, eid)
+        automaton.make_automaton()
+
+        for sent_idx, sentence_node, sentence_text, sentence_lower, sentence_charset in sent_cache:
+            hit_ids = {eid for _end, eid in automaton.iter(sentence_lower)}
+
+            # Method 4 (fuzzy theo từng từ) cho các entity nhiều từ chưa hit
+            for eid, (entity, _node, segmented_entity) in enumerate(entity_info):
+                if eid not in hit_ids and " " in entity:
+                    if improved_entity_matching(entity, sentence_text, segmented_entity,
+                                                sentence_lower=sentence_lower,
+                                                sentence_charset=sentence_charset):
+                        hit_ids.add(eid)
+
+            for eid in hit_ids:
+                connect_entity(entity_info[eid][1], sentence_node)
+                connections[eid] += 1
                 total_connections += 1
-        
-        if connections_made == 0:
+    else:
+        # Fallback thuần Python khi chưa cài pyahocorasick
+        for eid, (entity, entity_node, segmented_entity) in enumerate(entity_info):
+            # Tìm các sentences có chứa entity này
+            for sent_idx, sentence_node, sentence_text, sentence_lower, sentence_charset in sent_cache:
+                # SỬ DỤNG IMPROVED MATCHING
+                if improved_entity_matching(entity, sentence_text, segmented_entity,
+                                            sentence_lower=sentence_lower,
+                                            sentence_charset=sentence_charset):
+                    connect_entity(entity_node, sentence_node)
+                    connections[eid] += 1
+                    total_connections += 1
+
+    for eid, (entity, _node, _seg) in enumerate(entity_info):
+        if connections[eid] == 0:
             print(f"⚠️ Entity '{entity}' không match với sentence nào")
-    
+
     print(f"📊 Entity stats: {len(entity_nodes_added)} entities, {total_connections} total connections")
     return entity_nodes_added, total_connections
 
@@ -111,25 +238,82 @@ def count_sentences_in_context(context, model):
         # Fallback: đếm câu bằng dấu câu
         return len([s for s in context.split('.') if s.strip()])
 
-def process_sample_with_beam_search(sample_data, model, sample_index, output_dir="beam_output"):
+# Sentinel ngăn cách các văn bản khi gom nhiều text vào một lần gọi VnCoreNLP
+_BATCH_SEP = "BATCHSEPARATORTOKEN"
+
+def batch_annotate(model, texts):
+    """
+    Annotate nhiều văn bản trong MỘT lần gọi VnCoreNLP.
+
+    Mỗi lần gọi annotate_text phải đi qua JVM nên rất đắt; nối các văn bản
+    bằng một dòng sentinel rồi tách kết quả lại giúp amortize chi phí đó
+    trên toàn bộ batch. Trả về list các dict {sent_idx: tokens} cùng format
+    với model.annotate_text, theo đúng thứ tự của texts.
+    """
+    if not texts:
+        return []
+
+    joined = ("\n\n" + _BATCH_SEP + "\n\n").join(texts)
+    try:
+        annotated = model.annotate_text(joined)
+
+        results = []
+        current = {}
+        for sent_idx in sorted(annotated.keys()):
+            tokens = annotated[sent_idx]
+            if any(tok.get("wordForm") == _BATCH_SEP for tok in tokens):
+                results.append(current)
+                current = {}
+            else:
+                current[len(current)] = tokens
+        results.append(current)
+
+        # Nếu tokenizer tách sentinel khác dự kiến thì số văn bản sẽ lệch;
+        # khi đó quay về annotate từng văn bản để đảm bảo kết quả đúng
+        if len(results) == len(texts):
+            return results
+        print(f"⚠️ Batch annotate mismatch ({len(results)} != {len(texts)}), falling back")
+    except Exception as e:
+        print(f"⚠️ Batch annotate failed: {e}")
+
+    results = []
+    for text in texts:
+        try:
+            results.append(model.annotate_text(text))
+        except Exception:
+            results.append({})
+    return results
+
+def process_sample_with_beam_search(sample_data, model, sample_index, output_dir="beam_output", annotations=None):
     """
     Xử lý một sample: xây dựng TextGraph và chạy Beam Search với improved entity matching
+
+    annotations: tuple (context_sentences, claim_sentences) đã được batch
+    annotate sẵn trong main; nếu None thì gọi VnCoreNLP trực tiếp như cũ.
     """
     context = sample_data["context"]
     claim = sample_data["claim"]
     evidence = sample_data["evidence"]
     label = sample_data["label"]
-    
+
     print(f"📝 Processing sample {sample_index}: {claim[:60]}...")
-    
-    # Đếm tổng số câu trong context
-    total_context_sentences = count_sentences_in_context(context, model)
-    
+
+    if annotations is not None:
+        context_sentences, claim_sentences = annotations
+    else:
+        context_sentences = None
+        claim_sentences = None
+
     try:
-        # Xử lý context và claim với VnCoreNLP
-        context_sentences = model.annotate_text(context)
-        claim_sentences = model.annotate_text(claim)
-        
+        # Xử lý context và claim với VnCoreNLP (nếu chưa có annotation batch).
+        # Số câu của context suy ra trực tiếp từ kết quả annotate — trước đây
+        # count_sentences_in_context chạy thêm một lượt VnCoreNLP nữa trên
+        # đúng chuỗi context đó
+        if context_sentences is None:
+            context_sentences = model.annotate_text(context)
+            claim_sentences = model.annotate_text(claim)
+        total_context_sentences = len(context_sentences)
+
         # Tạo TextGraph
         text_graph = TextGraph()
         
@@ -142,6 +326,17 @@ def process_sample_with_beam_search(sample_data, model, sample_index, output_dir
         entity_stats = {"entities_count": 0, "connections_count": 0}
         try:
             entities = text_graph.extract_entities_with_openai(context)
+            # LLM hay trả về entity trùng lặp; dedupe (case-insensitive,
+            # giữ thứ tự) trước khi quét sentence cho từng entity
+            if entities:
+                seen = set()
+                deduped = []
+                for e in entities:
+                    e = e.strip() if e else ""
+                    if e and e.lower() not in seen:
+                        seen.add(e.lower())
+                        deduped.append(e)
+                entities = deduped
             if entities:
                 entity_nodes, total_connections = improved_add_entities_to_graph(
                     text_graph, entities, context_sentences, model
@@ -162,10 +357,7 @@ def process_sample_with_beam_search(sample_data, model, sample_index, output_dir
         beam_sentences = extract_sentences_from_paths(paths, text_graph)
         
         # Xử lý format sentences (replace _ thành space)
-        processed_sentences = []
-        for sentence in beam_sentences:
-            processed_sentence = sentence.replace("_", " ")
-            processed_sentences.append(processed_sentence)
+        processed_sentences = [s.translate(_UNDERSCORE_TO_SPACE) for s in beam_sentences]
         
         # Tính tỷ lệ beam_evidence / context_sentences
         beam_evidence_count = len(processed_sentences)
@@ -199,120 +391,203 @@ def extract_sentences_from_paths(paths, text_graph):
     """
     Trích xuất danh sách sentences từ beam search paths
     """
-    sentence_frequency = {}
-    
     # Kiểm tra paths structure
     if not paths:
         return []
     
-    # Đếm tần suất xuất hiện của mỗi sentence
-    for path_obj in paths:
-        visited_sentences = set()
-        
-        # Kiểm tra cấu trúc path object
-        if hasattr(path_obj, 'nodes'):
-            path_nodes = path_obj.nodes
-        elif hasattr(path_obj, 'path'):
-            path_nodes = path_obj.path
-        elif isinstance(path_obj, dict) and 'nodes' in path_obj:
-            path_nodes = path_obj['nodes']
-        elif isinstance(path_obj, dict) and 'path' in path_obj:
-            path_nodes = path_obj['path']
-        elif hasattr(path_obj, '__dict__'):
-            path_dict = path_obj.__dict__
-            if 'nodes' in path_dict:
-                path_nodes = path_dict['nodes']
-            elif 'path' in path_dict:
-                path_nodes = path_dict['path']
-            else:
-                continue
-        else:
+    # Trong một lần chạy mọi path object đều cùng kiểu, nên chỉ cần dò cấu
+    # trúc một lần trên phần tử đầu rồi dùng chung accessor cho cả list
+    first = paths[0]
+    if hasattr(first, 'nodes'):
+        get_nodes = lambda p: p.nodes
+    elif hasattr(first, 'path'):
+        get_nodes = lambda p: p.path
+    elif isinstance(first, dict) and 'nodes' in first:
+        get_nodes = lambda p: p['nodes']
+    elif isinstance(first, dict) and 'path' in first:
+        get_nodes = lambda p: p['path']
+    else:
+        return []
+
+    # Node id trong graph là string nên ánh xạ mỗi sentence text (khác
+    # rỗng) sang một chỉ số nguyên; mỗi node trong path chỉ cần một phép
+    # tra dict thay vì hai lần tra dict lồng nhau + so sánh chuỗi 'type'
+    graph_nodes = text_graph.graph.nodes
+    texts = []
+    text_index = {}
+    node_code = {}
+    for nid in text_graph.sentence_nodes.values():
+        sentence_text = graph_nodes[nid].get('text', '')
+        if not sentence_text:
             continue
-            
-        for node_id in path_nodes:
-            if node_id in text_graph.graph.nodes:
-                node_data = text_graph.graph.nodes[node_id]
-                if node_data.get('type') == 'sentence':
-                    sentence_text = node_data.get('text', '')
-                    if sentence_text and sentence_text not in visited_sentences:
-                        sentence_frequency[sentence_text] = sentence_frequency.get(sentence_text, 0) + 1
-                        visited_sentences.add(sentence_text)
-    
-    # Sắp xếp theo tần suất giảm dần
-    sorted_sentences = sorted(sentence_frequency.items(), key=lambda x: x[1], reverse=True)
-    
-    # Trả về top sentences (giới hạn 10 sentences)
-    return [sentence for sentence, freq in sorted_sentences[:10]]
+        idx = text_index.get(sentence_text)
+        if idx is None:
+            idx = len(texts)
+            text_index[sentence_text] = idx
+            texts.append(sentence_text)
+        node_code[nid] = idx
+
+    n_texts = len(texts)
+    if n_texts == 0:
+        return []
+
+    # Đếm tần suất bằng một pass NumPy: mã hoá (path_idx, text_idx) thành
+    # một số nguyên, np.unique khử trùng lặp trong từng path, rồi bincount
+    # trên phần text_idx — thay cho vòng lặp dict + set thuần Python
+    codes = np.fromiter(
+        (pi * n_texts + node_code[node_id]
+         for pi, path_obj in enumerate(paths)
+         for node_id in get_nodes(path_obj)
+         if node_id in node_code),
+        dtype=np.int64
+    )
+    if codes.size == 0:
+        return []
+
+    if numba is not None:
+        freqs = _count_unique_codes(np.sort(codes), n_texts)
+    else:
+        freqs = np.bincount(np.unique(codes) % n_texts, minlength=n_texts)
+
+    # Top 10 theo tần suất giảm dần: argpartition thay cho sort toàn bộ
+    k = min(10, n_texts)
+    top = np.argpartition(-freqs, k - 1)[:k]
+    top = top[np.argsort(-freqs[top], kind='stable')]
+    return [texts[i] for i in top if freqs[i] > 0]
+
+class Welford:
+    """
+    Thống kê streaming một pass theo thuật toán Welford (ổn định số học,
+    cho cùng kết quả với statistics.stdev): mean/std/min/max/total cập
+    nhật O(1) ngay khi mỗi sample hoàn thành, khỏi cần pass tổng hợp cuối.
+
+    Median vẫn cần đủ dữ liệu nên giữ lại một list float gọn (chỉ scalar,
+    không phải dict kết quả) cho riêng nó.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.values = []
+
+    def update(self, x):
+        x = float(x)
+        self.values.append(x)
+        self.n += 1
+        self.total += x
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
 
-def calculate_dataset_statistics(results):
+    @property
+    def std(self):
+        # ddof=1 giống statistics.stdev
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    @property
+    def median(self):
+        return float(np.median(self.values)) if self.values else 0.0
+
+# Các metric theo dõi streaming trong main; key trùng tên field trong
+# result["statistics"]
+_METRIC_NAMES = (
+    "coverage_ratio", "beam_evidence_count", "total_context_sentences",
+    "entities_extracted", "entity_connections", "paths_found"
+)
+
+def calculate_dataset_statistics(metrics):
     """
-    Tính toán thống kê tổng quan cho toàn bộ dataset
+    Tổng hợp dict thống kê từ các bộ đếm Welford đã cập nhật streaming
     """
-    if not results:
+    if not metrics or metrics["coverage_ratio"].n == 0:
         return {}
-    
-    # Collect metrics
-    coverage_ratios = []
-    beam_counts = []
-    context_sentence_counts = []
-    entity_counts = []
-    connection_counts = []
-    path_counts = []
-    
-    for result in results:
-        stats = result.get("statistics", {})
-        coverage_ratios.append(stats.get("coverage_ratio", 0))
-        beam_counts.append(stats.get("beam_evidence_count", 0))
-        context_sentence_counts.append(stats.get("total_context_sentences", 0))
-        entity_counts.append(stats.get("entities_extracted", 0))
-        connection_counts.append(stats.get("entity_connections", 0))
-        path_counts.append(stats.get("paths_found", 0))
-    
+
+    cov = metrics["coverage_ratio"]
+    bc = metrics["beam_evidence_count"]
+    cs = metrics["total_context_sentences"]
+    ec = metrics["entities_extracted"]
+    cc = metrics["entity_connections"]
+    pc = metrics["paths_found"]
+
     # Calculate statistics
     dataset_stats = {
-        "total_samples": len(results),
+        "total_samples": cov.n,
         "coverage_ratio": {
-            "mean": round(statistics.mean(coverage_ratios), 4),
-            "median": round(statistics.median(coverage_ratios), 4),
-            "min": round(min(coverage_ratios), 4),
-            "max": round(max(coverage_ratios), 4),
-            "std": round(statistics.stdev(coverage_ratios) if len(coverage_ratios) > 1 else 0, 4)
-        },
-        "coverage_percentage": {
-            "mean": round(statistics.mean(coverage_ratios) * 100, 2),
-            "median": round(statistics.median(coverage_ratios) * 100, 2),
-            "min": round(min(coverage_ratios) * 100, 2),
-            "max": round(max(coverage_ratios) * 100, 2)
+            "mean": round(cov.mean, 4),
+            "median": round(cov.median, 4),
+            "min": round(cov.min, 4),
+            "max": round(cov.max, 4),
+            "std": round(cov.std, 4)
         },
         "beam_evidence_count": {
-            "total": sum(beam_counts),
-            "mean": round(statistics.mean(beam_counts), 2),
-            "median": statistics.median(beam_counts),
-            "min": min(beam_counts),
-            "max": max(beam_counts)
+            "total": int(bc.total),
+            "mean": round(bc.mean, 2),
+            "median": bc.median,
+            "min": int(bc.min),
+            "max": int(bc.max)
         },
         "context_sentences": {
-            "total": sum(context_sentence_counts),
-            "mean": round(statistics.mean(context_sentence_counts), 2),
-            "median": statistics.median(context_sentence_counts),
-            "min": min(context_sentence_counts),
-            "max": max(context_sentence_counts)
+            "total": int(cs.total),
+            "mean": round(cs.mean, 2),
+            "median": cs.median,
+            "min": int(cs.min),
+            "max": int(cs.max)
         },
         "entities": {
-            "total_extracted": sum(entity_counts),
-            "total_connections": sum(connection_counts),
-            "mean_per_sample": round(statistics.mean(entity_counts), 2),
-            "mean_connections_per_sample": round(statistics.mean(connection_counts), 2)
+            "total_extracted": int(ec.total),
+            "total_connections": int(cc.total),
+            "mean_per_sample": round(ec.mean, 2),
+            "mean_connections_per_sample": round(cc.mean, 2)
         },
         "paths": {
-            "total": sum(path_counts),
-            "mean_per_sample": round(statistics.mean(path_counts), 2),
-            "median": statistics.median(path_counts)
+            "total": int(pc.total),
+            "mean_per_sample": round(pc.mean, 2),
+            "median": pc.median
         }
     }
-    
+
+    # coverage_percentage chỉ là coverage_ratio * 100 — suy ra từ các scalar
+    # vừa tính thay vì duyệt lại array thêm bốn lần nữa
+    ratio = dataset_stats["coverage_ratio"]
+    dataset_stats["coverage_percentage"] = {
+        "mean": round(ratio["mean"] * 100, 2),
+        "median": round(ratio["median"] * 100, 2),
+        "min": round(ratio["min"] * 100, 2),
+        "max": round(ratio["max"] * 100, 2)
+    }
+
     return dataset_stats
 
+# Model riêng của mỗi worker process (JVM của VnCoreNLP là per-process)
+_WORKER_MODEL = None
+
+def _init_worker(vncorenlp_path):
+    """
+    Khởi tạo một VnCoreNLP model cho worker process hiện tại
+    """
+    global _WORKER_MODEL
+    cwd = os.getcwd()
+    _WORKER_MODEL = py_vncorenlp.VnCoreNLP(save_dir=vncorenlp_path)
+    os.chdir(cwd)
+
+def _process_sample_task(task):
+    """
+    Chạy một sample trong worker process với model cục bộ của worker
+    """
+    i, sample, annotations = task
+    result, success = process_sample_with_beam_search(
+        sample, _WORKER_MODEL, i + 1, annotations=annotations
+    )
+    return i, result, success
+
 def main():
     """
     Main function để xử lý toàn bộ 300 samples với thống kê chi tiết
@@ -320,16 +595,12 @@ def main():
     print("🚀 Starting FULL DATASET processing with detailed statistics...")
     print("📊 Target: Process all 300 samples with beam_evidence coverage analysis")
     
-    # Lưu working directory hiện tại
-    original_cwd = os.getcwd()
-    
-    # Khởi tạo VnCoreNLP model với đường dẫn tuyệt đối
+    # Khởi tạo VnCoreNLP model qua singleton dùng chung: nếu một pipeline
+    # khác trong cùng process đã boot JVM thì dùng lại, khỏi tốn thêm
+    # vài giây startup và ~500MB RAM
     print("📖 Loading VnCoreNLP model...")
     vncorenlp_path = os.path.abspath("vncorenlp")
-    model = py_vncorenlp.VnCoreNLP(save_dir=vncorenlp_path)
-    
-    # Khôi phục working directory
-    os.chdir(original_cwd)
+    model = get_model(vncorenlp_path)
     
     # Đọc input file
     input_file = "raw_test.json"
@@ -345,60 +616,109 @@ def main():
     
     # Tạo output directory
     os.makedirs("beam_output", exist_ok=True)
-    
-    # Xử lý toàn bộ samples
-    results = []
+
+    # Stream từng result xuống đĩa ngay khi xử lý xong thay vì giữ cả 300
+    # sample (kèm nguyên văn context) trong RAM đến cuối; trong bộ nhớ chỉ
+    # giữ lại phần statistics nhẹ cho bước tổng hợp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_file = f"beam_output/full_dataset_with_stats_{timestamp}.json"
+    stats_file = f"beam_output/dataset_statistics_{timestamp}.json"
+
+    out_f = open(output_file, 'w', encoding='utf-8')
+    out_f.write('[\n')
+    first_result = True
+
+    # Xử lý toàn bộ samples; mỗi metric có một bộ đếm Welford cập nhật
+    # ngay trong vòng lặp nên không cần giữ list statistics nào đến cuối
+    metrics = {name: Welford() for name in _METRIC_NAMES}
     success_count = 0
     
     # Thống kê realtime
     total_beam_sentences = 0
     total_context_sentences = 0
     
+    # Pass 1: gom toàn bộ context + claim thành một request VnCoreNLP duy nhất
+    # để tránh trả chi phí round-trip JVM 2 lần cho mỗi sample
+    print(f"\n📖 Batch annotating {len(data)} contexts + claims...")
+    texts = [sample["context"] for sample in data] + [sample["claim"] for sample in data]
+    batch_results = batch_annotate(model, texts)
+    context_annotations = batch_results[:len(data)]
+    claim_annotations = batch_results[len(data):]
+
+    # Pass 2: dựng TextGraph cho từng sample từ annotation đã có sẵn.
+    # Các sample độc lập với nhau nên có thể chạy song song bằng process
+    # pool (mỗi worker tự khởi động một JVM VnCoreNLP riêng); đặt biến môi
+    # trường FACTCHECK_WORKERS > 1 để bật
+    num_workers = int(os.environ.get("FACTCHECK_WORKERS", "1"))
     print(f"\n🔄 Processing {len(data)} samples...")
-    
-    for i, sample in enumerate(data):
+
+    pool = None
+    if num_workers > 1:
+        from multiprocessing import Pool
+        print(f"🧵 Using {num_workers} worker processes (one VnCoreNLP JVM each)")
+        tasks = [
+            (i, sample, (context_annotations[i], claim_annotations[i]))
+            for i, sample in enumerate(data)
+        ]
+        pool = Pool(processes=num_workers, initializer=_init_worker,
+                    initargs=(vncorenlp_path,))
+        sample_results = pool.imap_unordered(_process_sample_task, tasks, chunksize=4)
+    else:
+        sample_results = (
+            (i, *process_sample_with_beam_search(
+                sample, model, i+1,
+                annotations=(context_annotations[i], claim_annotations[i])
+            ))
+            for i, sample in enumerate(data)
+        )
+
+    processed = 0
+    for i, result, success in sample_results:
         print(f"\n{'='*60}")
-        
-        result, success = process_sample_with_beam_search(sample, model, i+1)
-        
+        processed += 1
+
         if success and result:
-            results.append(result)
+            if not first_result:
+                out_f.write(',\n')
+            json.dump(result, out_f, ensure_ascii=False, indent=2)
+            first_result = False
             success_count += 1
-            
+
             # Update running statistics
             stats = result.get("statistics", {})
+            for name in _METRIC_NAMES:
+                metrics[name].update(stats.get(name, 0))
             beam_count = stats.get("beam_evidence_count", 0)
             context_count = stats.get("total_context_sentences", 0)
             coverage = stats.get("coverage_percentage", 0)
-            
+
             total_beam_sentences += beam_count
             total_context_sentences += context_count
-            
+
             print(f"✅ Sample {i+1}: {beam_count} beam evidence / {context_count} context sentences = {coverage}%")
-            
+
         else:
             print(f"❌ Sample {i+1}: Failed to process")
-        
+
         # Progress update every 50 samples
-        if (i + 1) % 50 == 0:
+        if processed % 50 == 0:
             current_coverage = (total_beam_sentences / total_context_sentences * 100) if total_context_sentences > 0 else 0
-            print(f"\n📈 Progress: {i+1}/{len(data)} ({(i+1)/len(data)*100:.1f}%)")
+            print(f"\n📈 Progress: {processed}/{len(data)} ({processed/len(data)*100:.1f}%)")
             print(f"📊 Running stats: {success_count} successful, {total_beam_sentences} total beam evidence")
             print(f"📊 Overall coverage so far: {current_coverage:.2f}%")
-    
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    # Đóng mảng JSON đã stream
+    out_f.write('\n]\n')
+    out_f.close()
+
     # Tính toán thống kê tổng quan
     print(f"\n🧮 Calculating comprehensive statistics...")
-    dataset_stats = calculate_dataset_statistics(results)
-    
-    # Lưu kết quả
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = f"beam_output/full_dataset_with_stats_{timestamp}.json"
-    stats_file = f"beam_output/dataset_statistics_{timestamp}.json"
-    
-    # Lưu data + individual stats
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
-    
+    dataset_stats = calculate_dataset_statistics(metrics)
+
     # Lưu tổng thống kê riêng
     with open(stats_file, 'w', encoding='utf-8') as f:
         json.dump(dataset_stats, f, ensure_ascii=False, indent=2)
@@ -1,6 +1,6 @@
 import json
-import py_vncorenlp
 from mint.text_graph import TextGraph
+from mint.vncorenlp_singleton import get_model
 import os
 from datetime import datetime
 
@@ -72,12 +72,16 @@ def extract_sentences_from_paths(paths, text_graph):
     Trích xuất danh sách sentences từ beam search paths
     """
     sentence_frequency = {}
-    
+
     # Kiểm tra paths structure
     if not paths:
         print("⚠️  No paths found")
         return []
-    
+
+    # Giữ NodeView trong biến local: mỗi lần text_graph.graph.nodes là hai
+    # phép tra attribute, nhân với mọi node của mọi path trong vòng trong
+    graph_nodes = text_graph.graph.nodes
+
     # Đếm tần suất xuất hiện của mỗi sentence
     for path_obj in paths:
         visited_sentences = set()
@@ -104,8 +108,8 @@ def extract_sentences_from_paths(paths, text_graph):
             continue
             
         for node_id in path_nodes:
-            if node_id in text_graph.graph.nodes:
-                node_data = text_graph.graph.nodes[node_id]
+            if node_id in graph_nodes:
+                node_data = graph_nodes[node_id]
                 if node_data.get('type') == 'sentence':
                     sentence_text = node_data.get('text', '')
                     if sentence_text and sentence_text not in visited_sentences:
@@ -126,18 +130,11 @@ def main():
     """
     print("🚀 Starting Beam Search processing...")
     
-    # Lưu working directory hiện tại
-    original_cwd = os.getcwd()
-    print(f"📂 Original working directory: {original_cwd}")
-    
-    # Khởi tạo VnCoreNLP model với đường dẫn tuyệt đối
+    # Khởi tạo VnCoreNLP model qua singleton dùng chung (boot JVM đúng một
+    # lần cho cả process, kể cả khi pipeline khác đã load model trước đó)
     print("📖 Loading VnCoreNLP model...")
-    vncorenlp_path = os.path.abspath("vncorenlp")
-    model = py_vncorenlp.VnCoreNLP(save_dir=vncorenlp_path)
-    
-    # Khôi phục working directory
-    os.chdir(original_cwd)
-    print(f"📂 Restored working directory: {os.getcwd()}")
+    model = get_model()
+    print(f"📂 Working directory: {os.getcwd()}")
     
     # Đọc input file
     input_file = "raw_test.json"
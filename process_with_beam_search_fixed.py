@@ -1,102 +1,365 @@
+import functools
+import hashlib
 import json
+import logging
+import operator
 import py_vncorenlp
 from mint.text_graph import TextGraph
 import os
+import numpy as np
 from datetime import datetime
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+# Bảng translate dựng sẵn cho bước đổi _ thành space ở output
+_UND2SPACE = str.maketrans({"_": " "})
+
+logger = logging.getLogger(__name__)
+
 # IMPROVED ENTITY MATCHING FUNCTIONS
-def segment_entity_with_vncorenlp(entity, model):
+
+# Model VnCoreNLP dùng chung ở module level, gán trong main(); nhờ đó
+# segment_entity_with_vncorenlp chỉ nhận entity string và cache được bằng
+# lru_cache (không phải key theo object model)
+_VNCORENLP = None
+
+@functools.lru_cache(maxsize=None)
+def segment_entity_with_vncorenlp(entity):
     """
     Segment entity sử dụng VnCoreNLP để match với segmented text
+
+    Kết quả chỉ phụ thuộc entity string nên cache vĩnh viễn: mỗi entity
+    tốn đúng một round-trip JVM cho cả run, kể cả khi lặp giữa các sample.
     """
     try:
-        result = model.annotate_text(entity)
+        result = _VNCORENLP.annotate_text(entity)
         segmented_words = []
         if result and len(result) > 0:
             first_sentence = list(result.values())[0]
             for token in first_sentence:
                 segmented_words.append(token["wordForm"])
-        
+
         segmented_entity = "_".join(segmented_words)
         return segmented_entity
-        
+
     except Exception as e:
         # Fallback: simple space to underscore replacement
         return entity.replace(" ", "_")
 
-def improved_entity_matching(entity, sentence_text, model=None):
+def _build_entity_variants(entity, model=None, with_segmentation=True):
     """
-    Improved entity matching với support cho segmented text
+    Tính trước mọi biến thể chỉ phụ thuộc entity (không phụ thuộc sentence):
+    lowercase, space->underscore, segmentation VnCoreNLP và biến thể của
+    từng từ cho fuzzy matching. Gọi MỘT lần cho mỗi entity thay vì để
+    improved_entity_matching tính lại cho từng (entity, sentence).
+
+    with_segmentation=False bỏ qua bước segment VnCoreNLP để caller có thể
+    hoãn nó đến khi các method rẻ đã thất bại hết.
     """
+    global _VNCORENLP
+    if model is not None and _VNCORENLP is None:
+        _VNCORENLP = model
+
     entity_lower = entity.lower()
-    sentence_lower = sentence_text.lower()
-    
+    entity_simple_seg = entity.replace(" ", "_").lower()
+
+    entity_vncorenlp_seg = None
+    if with_segmentation and _VNCORENLP is not None:
+        try:
+            entity_vncorenlp_seg = segment_entity_with_vncorenlp(entity).lower()
+        except:
+            pass
+
+    # Biến thể theo từng từ cho fuzzy matching; bản replace(" ", "_") trên
+    # một từ đơn là no-op nên chỉ cần dạng lowercase
+    words_lower = [word.lower() for word in entity.split()]
+
+    return (entity_lower, entity_simple_seg, entity_vncorenlp_seg, words_lower)
+
+def improved_entity_matching_prelowered(entity_variants, sentence_lower):
+    """
+    Improved entity matching trên dữ liệu đã lowercase/segment sẵn
+    """
+    entity_lower, entity_simple_seg, entity_vncorenlp_seg, words_lower = entity_variants
+
     # Method 1: Direct matching
     if entity_lower in sentence_lower:
         return True
-    
+
     # Method 2: Simple space->underscore replacement
-    entity_simple_seg = entity.replace(" ", "_").lower()
     if entity_simple_seg in sentence_lower:
         return True
-    
+
     # Method 3: VnCoreNLP segmentation
-    if model:
-        try:
-            entity_vncorenlp_seg = segment_entity_with_vncorenlp(entity, model).lower()
-            if entity_vncorenlp_seg in sentence_lower:
-                return True
-        except:
-            pass
-    
+    if entity_vncorenlp_seg and entity_vncorenlp_seg in sentence_lower:
+        return True
+
     # Method 4: Fuzzy matching cho partial matches
-    entity_words = entity.split()
-    if len(entity_words) > 1:
-        all_words_found = True
-        for word in entity_words:
-            word_variants = [
-                word.lower(),
-                word.replace(" ", "_").lower()
-            ]
-            
-            word_found = any(variant in sentence_lower for variant in word_variants)
-            if not word_found:
-                all_words_found = False
-                break
-        
-        if all_words_found:
+    if len(words_lower) > 1:
+        if all(word in sentence_lower for word in words_lower):
             return True
-    
+
     return False
 
+def improved_entity_matching(entity, sentence_text, model=None):
+    """
+    Improved entity matching với support cho segmented text
+    """
+    return improved_entity_matching_prelowered(
+        _build_entity_variants(entity, model), sentence_text.lower()
+    )
+
+def _build_context_seg_index(context_sentences, max_n=5):
+    """
+    Index n-gram (n=1..5) trên các wordForm token của context đã segment:
+    key là dạng space-lowercase của cửa sổ token, value là dạng nối
+    underscore. Entity tra được ở đây thì lấy ngay dạng segmented khớp
+    với text trong graph mà không cần gọi lại VnCoreNLP — context vốn đã
+    được segment đúng một lần rồi.
+    """
+    index = {}
+    setdefault = index.setdefault
+    for tokens in context_sentences.values():
+        word_forms = [tok.get("wordForm", "") for tok in tokens]
+        length = len(word_forms)
+        for i in range(length):
+            for n in range(1, max_n + 1):
+                if i + n > length:
+                    break
+                seg = "_".join(word_forms[i:i + n]).lower()
+                setdefault(seg.replace("_", " "), seg)
+    return index
+
 def improved_add_entities_to_graph(text_graph, entities, context_sentences, model):
     """
     Improved version của add_entities_to_graph với better matching
     """
     entity_nodes_added = []
-    
+
+    # Lowercase mỗi sentence đúng một lần cho cả vòng entity thay vì
+    # O(E·S) lần bên trong improved_entity_matching
+    graph_nodes = text_graph.graph.nodes
+    sent_cache = [
+        (sent_idx, sentence_node, graph_nodes[sentence_node]['text'].lower())
+        for sent_idx, sentence_node in text_graph.sentence_nodes.items()
+    ]
+
+    # Bloom mask 64-bit trên mọi ký tự (lowercase) của context: bit thứ
+    # ord(c) & 63 bật nếu ký tự xuất hiện ở bất kỳ sentence nào. Entity
+    # chứa ký tự không có bit tương ứng thì không thể match bằng bất kỳ
+    # method nào — loại ngay trong O(|entity|) trước mọi lần quét
+    context_mask = 0
+    for _idx, _node, sentence_lower in sent_cache:
+        for c in sentence_lower:
+            context_mask |= 1 << (ord(c) & 63)
+    not_in_context = ~context_mask
+
+    # Chuẩn bị node + biến thể rẻ cho mỗi entity; segmentation VnCoreNLP
+    # hoãn lại — chỉ entity nào không match bằng method rẻ mới cần đến
+    entity_info = []  # (entity, entity_node, entity_variants)
+    prefiltered = set()  # eid bị bloom mask loại, bỏ qua mọi pass matching
     for entity in entities:
-        # Thêm entity node
         entity_node = text_graph.add_entity_node(entity)
         entity_nodes_added.append(entity_node)
-        
-        connections_made = 0
-        # Tìm các sentences có chứa entity này
-        for sent_idx, sentence_node in text_graph.sentence_nodes.items():
-            sentence_text = text_graph.graph.nodes[sentence_node]['text']
-            
-            # SỬ DỤNG IMPROVED MATCHING
-            if improved_entity_matching(entity, sentence_text, model):
-                text_graph.connect_entity_to_sentence(entity_node, sentence_node)
-                connections_made += 1
-                print(f"✅ Improved: Kết nối entity '{entity}' với sentence {sent_idx}")
-        
-        if connections_made == 0:
+        eid = len(entity_info)
+        entity_info.append((entity, entity_node,
+                            _build_entity_variants(entity, model, with_segmentation=False)))
+        # Space/underscore bị các biến thể hoán đổi cho nhau nên không tính
+        # vào mask của entity
+        entity_mask = 0
+        for c in entity.lower():
+            if c not in " _":
+                entity_mask |= 1 << (ord(c) & 63)
+        if entity_mask & not_in_context:
+            prefiltered.add(eid)
+
+    connections = [0] * len(entity_info)
+    # Gom các cặp (entity_node, sentence_node) rồi insert MỘT lần bằng
+    # bulk_connect_entity_sentences thay vì add_edge từng cặp
+    edge_pairs = []
+
+    if ahocorasick is not None and entity_info:
+        # Gom mọi biến thể substring của tất cả entity vào MỘT automaton
+        # Aho-Corasick rồi quét mỗi sentence đúng một lần: O(S·L + hits)
+        # thay vì O(E·S) lần quét substring bằng Python
+        # add_word ghi đè value khi hai entity chia sẻ cùng một biến thể
+        # (vd chỉ khác hoa/thường) — gom eid thành list theo biến thể để
+        # mọi entity trùng dạng đều được đánh dấu hit
+        eids_by_variant = {}
+        for eid, (entity, _node, variants) in enumerate(entity_info):
+            if eid in prefiltered:
+                continue
+            entity_lower, entity_simple_seg, entity_vncorenlp_seg, _words = variants
+            for variant in {entity_lower, entity_simple_seg, entity_vncorenlp_seg or ""}:
+                if variant:
+                    eids_by_variant.setdefault(variant, []).append(eid)
+
+        automaton = ahocorasick.Automaton()
+        for variant, eids in eids_by_variant.items():
+            automaton.add_word(variant, eids)
+        automaton.make_automaton()
+
+        # Chỉ entity nhiều từ mới đủ điều kiện fuzzy fallback — lọc danh
+        # sách ứng viên một lần thay vì duyệt lại toàn bộ entity_info
+        # trong từng sentence
+        fuzzy_candidates = [
+            (eid, variants) for eid, (_e, _n, variants) in enumerate(entity_info)
+            if len(variants[3]) > 1 and eid not in prefiltered
+        ]
+
+        for sent_idx, sentence_node, sentence_lower in sent_cache:
+            hit_ids = {eid for _end, eids in automaton.iter(sentence_lower)
+                       for eid in eids}
+
+            # Method 4 (fuzzy theo từng từ) cho các entity nhiều từ chưa hit
+            for eid, variants in fuzzy_candidates:
+                if eid not in hit_ids:
+                    if improved_entity_matching_prelowered(variants, sentence_lower):
+                        hit_ids.add(eid)
+
+            for eid in hit_ids:
+                entity, entity_node, _variants = entity_info[eid]
+                edge_pairs.append((entity_node, sentence_node))
+                connections[eid] += 1
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Kết nối entity '%s' với sentence %s", entity, sent_idx)
+    else:
+        # Fallback thuần Python khi chưa cài pyahocorasick
+        for eid, (entity, entity_node, entity_variants) in enumerate(entity_info):
+            if eid in prefiltered:
+                continue
+            # Tìm các sentences có chứa entity này
+            for sent_idx, sentence_node, sentence_lower in sent_cache:
+                # SỬ DỤNG IMPROVED MATCHING
+                if improved_entity_matching_prelowered(entity_variants, sentence_lower):
+                    edge_pairs.append((entity_node, sentence_node))
+                    connections[eid] += 1
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Kết nối entity '%s' với sentence %s", entity, sent_idx)
+
+    # Chỉ entity nhiều từ chưa có hit nào mới cần dạng segmented. Tra
+    # trước trong index n-gram của context (đã segment sẵn); chỉ khi
+    # entity không xuất hiện nguyên cửa sổ nào trong context mới rơi về
+    # một lần gọi VnCoreNLP (đã lru_cache)
+    seg_index = None
+    for eid, (entity, entity_node, _variants) in enumerate(entity_info):
+        if connections[eid] > 0 or " " not in entity or eid in prefiltered:
+            continue
+        if seg_index is None:
+            seg_index = _build_context_seg_index(context_sentences)
+        segmented = seg_index.get(" ".join(entity.lower().split()))
+        if segmented is None:
+            try:
+                segmented = segment_entity_with_vncorenlp(entity).lower()
+            except:
+                continue
+        # Trùng biến thể space->underscore thì đã quét ở pass trước rồi
+        if not segmented or segmented == entity.replace(" ", "_").lower():
+            continue
+        for sent_idx, sentence_node, sentence_lower in sent_cache:
+            if segmented in sentence_lower:
+                edge_pairs.append((entity_node, sentence_node))
+                connections[eid] += 1
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Kết nối entity '%s' với sentence %s", entity, sent_idx)
+
+    text_graph.bulk_connect_entity_sentences(edge_pairs)
+
+    for eid, (entity, _node, _variants) in enumerate(entity_info):
+        if connections[eid] == 0:
             print(f"⚠️ Entity '{entity}' không match với sentence nào")
-    
-    print(f"Đã thêm {len(entity_nodes_added)} entity nodes vào graph với improved matching.")
+
+    # Một dòng tổng kết thay cho hàng loạt print trong vòng lặp trong cùng
+    print(f"Đã thêm {len(entity_nodes_added)} entity nodes vào graph với improved matching "
+          f"({sum(connections)} connections).")
     return entity_nodes_added
 
+# Cache annotation VnCoreNLP trên đĩa (diskcache, optional): khi lặp lại
+# cùng dataset để chỉnh matching/beam search, các lần chạy sau bỏ qua hẳn
+# bước annotate — chi phí lớn nhất mỗi sample. Bump version byte khi đổi
+# model VnCoreNLP để vô hiệu cache cũ.
+_ANNOTATION_CACHE_VERSION = b"\x01"
+_ANNOTATION_CACHE = None
+
+def _get_annotation_cache():
+    """Mở cache annotation đúng một lần, trả None nếu thiếu diskcache"""
+    global _ANNOTATION_CACHE
+    if _ANNOTATION_CACHE is None and diskcache is not None:
+        _ANNOTATION_CACHE = diskcache.Cache(".vncorenlp_cache")
+    return _ANNOTATION_CACHE
+
+def _cached_annotate(model, text):
+    """
+    model.annotate_text với cache trên đĩa, key theo blake2b của text
+    (kèm version byte). Cache lỗi kiểu gì cũng rơi về annotate trực tiếp.
+    """
+    cache = _get_annotation_cache()
+    if cache is None:
+        return model.annotate_text(text)
+
+    key = hashlib.blake2b(_ANNOTATION_CACHE_VERSION + text.encode("utf-8"),
+                          digest_size=16).hexdigest()
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    except Exception as e:
+        print(f"⚠️ Annotation cache read failed: {e}")
+
+    result = model.annotate_text(text)
+    try:
+        cache[key] = result
+    except Exception as e:
+        print(f"⚠️ Annotation cache write failed: {e}")
+    return result
+
+# Sentinel ngăn cách context và claim khi annotate chung một lần
+_CLAIM_SEP = "CLAIMSEPARATORTOKEN"
+
+def _annotate_context_and_claim(model, context, claim):
+    """
+    Annotate context + claim trong MỘT lần gọi VnCoreNLP: nối hai văn bản
+    qua một dòng sentinel rồi tách kết quả theo câu chứa sentinel, giảm số
+    round-trip JVM mỗi sample từ hai xuống một. Sentinel bị tokenize khác
+    dự kiến thì quay về hai lần gọi riêng như cũ.
+    """
+    try:
+        annotated = _cached_annotate(
+            model, context + "\n\n" + _CLAIM_SEP + "\n\n" + claim
+        )
+
+        context_sentences = {}
+        claim_sentences = {}
+        current = context_sentences
+        seen_sep = False
+        for sent_idx in sorted(annotated.keys()):
+            tokens = annotated[sent_idx]
+            if not seen_sep and any(tok.get("wordForm") == _CLAIM_SEP for tok in tokens):
+                seen_sep = True
+                current = claim_sentences
+                continue
+            current[len(current)] = tokens
+
+        if seen_sep and claim_sentences:
+            return context_sentences, claim_sentences
+    except Exception as e:
+        print(f"⚠️ Batched annotate failed, falling back: {e}")
+
+    return _cached_annotate(model, context), _cached_annotate(model, claim)
+
 def process_sample_with_beam_search(sample_data, model, output_dir="beam_output"):
     """
     Xử lý một sample: xây dựng TextGraph và chạy Beam Search với improved entity matching
@@ -109,9 +372,10 @@ def process_sample_with_beam_search(sample_data, model, output_dir="beam_output"
     print(f"Processing claim: {claim[:100]}...")
     
     try:
-        # Xử lý context và claim với VnCoreNLP
-        context_sentences = model.annotate_text(context)
-        claim_sentences = model.annotate_text(claim)
+        # Xử lý context và claim với VnCoreNLP (gộp một lần gọi)
+        context_sentences, claim_sentences = _annotate_context_and_claim(
+            model, context, claim
+        )
         
         # Tạo TextGraph
         text_graph = TextGraph()
@@ -140,14 +404,12 @@ def process_sample_with_beam_search(sample_data, model, output_dir="beam_output"
             max_paths=20
         )
         
-        # Trích xuất sentences từ paths
-        beam_sentences = extract_sentences_from_paths(paths, text_graph)
-        
-        # Xử lý format sentences (replace _ thành space)
-        processed_sentences = []
-        for sentence in beam_sentences:
-            processed_sentence = sentence.replace("_", " ")
-            processed_sentences.append(processed_sentence)
+        # Trích xuất sentences từ paths và format lại (_ thành space) trong
+        # một pass duy nhất, khỏi materialize list trung gian
+        processed_sentences = [
+            sentence.translate(_UND2SPACE)
+            for sentence in extract_sentences_from_paths(paths, text_graph)
+        ]
         
         # Tạo result
         result = {
@@ -164,62 +426,113 @@ def process_sample_with_beam_search(sample_data, model, output_dir="beam_output"
         print(f"❌ Error processing sample: {e}")
         return None, False
 
+def _resolve_path_accessor(path_obj):
+    """
+    Chọn cách lấy danh sách node từ một path object. Trong một lần chạy mọi
+    path đều cùng kiểu nên chỉ cần dò cấu trúc đúng một lần trên phần tử
+    đầu rồi dùng chung accessor cho cả list.
+    """
+    if hasattr(path_obj, 'nodes'):
+        return lambda p: p.nodes
+    if hasattr(path_obj, 'path'):
+        return lambda p: p.path
+    if isinstance(path_obj, dict) and 'nodes' in path_obj:
+        return operator.itemgetter('nodes')
+    if isinstance(path_obj, dict) and 'path' in path_obj:
+        return operator.itemgetter('path')
+    return None
+
 def extract_sentences_from_paths(paths, text_graph):
     """
     Trích xuất danh sách sentences từ beam search paths
     """
-    sentence_frequency = {}
-    
     # Kiểm tra paths structure
     if not paths:
         print("⚠️  No paths found")
         return []
-    
-    # Đếm tần suất xuất hiện của mỗi sentence
-    for path_obj in paths:
-        visited_sentences = set()
-        
-        # Kiểm tra cấu trúc path object
-        if hasattr(path_obj, 'nodes'):
-            path_nodes = path_obj.nodes
-        elif hasattr(path_obj, 'path'):
-            path_nodes = path_obj.path
-        elif isinstance(path_obj, dict) and 'nodes' in path_obj:
-            path_nodes = path_obj['nodes']
-        elif isinstance(path_obj, dict) and 'path' in path_obj:
-            path_nodes = path_obj['path']
-        elif hasattr(path_obj, '__dict__'):
-            path_dict = path_obj.__dict__
-            if 'nodes' in path_dict:
-                path_nodes = path_dict['nodes']
-            elif 'path' in path_dict:
-                path_nodes = path_dict['path']
-            else:
-                continue
-        else:
+
+    get_nodes = _resolve_path_accessor(paths[0])
+    if get_nodes is None:
+        return []
+
+    # Node id là string nên ánh xạ trước mỗi sentence text (khác rỗng)
+    # sang một chỉ số nguyên; trong vòng path mỗi node chỉ tốn một phép
+    # tra dict thay vì tra node attrs + so sánh 'type'
+    graph_nodes = text_graph.graph.nodes
+    texts = []
+    text_index = {}
+    node_code = {}
+    for nid in text_graph.sentence_nodes.values():
+        sentence_text = graph_nodes[nid].get('text', '')
+        if not sentence_text:
             continue
-            
-        for node_id in path_nodes:
-            if node_id in text_graph.graph.nodes:
-                node_data = text_graph.graph.nodes[node_id]
-                if node_data.get('type') == 'sentence':
-                    sentence_text = node_data.get('text', '')
-                    if sentence_text and sentence_text not in visited_sentences:
-                        sentence_frequency[sentence_text] = sentence_frequency.get(sentence_text, 0) + 1
-                        visited_sentences.add(sentence_text)
-    
-    # Sắp xếp theo tần suất giảm dần
-    sorted_sentences = sorted(sentence_frequency.items(), key=lambda x: x[1], reverse=True)
-    
-    print(f"📊 Found {len(sentence_frequency)} unique sentences")
-    
-    # Trả về top sentences (giới hạn 10 sentences)
-    return [sentence for sentence, freq in sorted_sentences[:10]]
+        idx = text_index.get(sentence_text)
+        if idx is None:
+            idx = len(texts)
+            text_index[sentence_text] = idx
+            texts.append(sentence_text)
+        node_code[nid] = idx
+
+    n_texts = len(texts)
+    if n_texts == 0:
+        return []
+
+    # Đếm tần suất bằng một pass NumPy: mã hoá (path_idx, text_idx) thành
+    # một số nguyên, np.unique khử trùng lặp trong từng path, rồi bincount
+    # trên phần text_idx — thay cho Counter + set thuần Python
+    codes = np.fromiter(
+        (pi * n_texts + node_code[node_id]
+         for pi, path_obj in enumerate(paths)
+         for node_id in get_nodes(path_obj)
+         if node_id in node_code),
+        dtype=np.int64
+    )
+    if codes.size == 0:
+        return []
+
+    freqs = np.bincount(np.unique(codes) % n_texts, minlength=n_texts)
+
+    print(f"📊 Found {np.count_nonzero(freqs)} unique sentences")
+
+    # Top 10 theo tần suất giảm dần: argpartition thay cho sort toàn bộ
+    k = min(10, n_texts)
+    top = np.argpartition(-freqs, k - 1)[:k]
+    top = top[np.argsort(-freqs[top], kind='stable')]
+    return [texts[i] for i in top if freqs[i] > 0]
+
+# Model riêng của mỗi worker process (JVM của VnCoreNLP là per-process)
+_WORKER_MODEL = None
+
+def _init_worker(vncorenlp_path):
+    """
+    Khởi tạo một VnCoreNLP model cho worker process hiện tại; JVM startup
+    trả một lần cho mỗi worker rồi amortize trên các sample nó xử lý
+    """
+    global _WORKER_MODEL, _VNCORENLP
+    cwd = os.getcwd()
+    _WORKER_MODEL = py_vncorenlp.VnCoreNLP(save_dir=vncorenlp_path)
+    os.chdir(cwd)
+    # Cho cache segmentation trong worker dùng cùng model
+    _VNCORENLP = _WORKER_MODEL
+
+def _worker_process_sample(indexed_sample):
+    """
+    Chạy một sample trong worker process với model cục bộ của worker
+    """
+    i, sample = indexed_sample
+    result, success = process_sample_with_beam_search(sample, _WORKER_MODEL)
+    return i, result, success
 
 def main():
     """
     Main function để xử lý toàn bộ dataset với improved entity matching
     """
+    global _VNCORENLP
+
+    # DEBUG tắt mặc định nên các logger.debug trong vòng lặp match gần như
+    # miễn phí; bật bằng logging.DEBUG khi cần soi từng kết nối
+    logging.basicConfig(level=logging.INFO)
+
     print("🚀 Starting Beam Search processing with IMPROVED ENTITY MATCHING...")
     
     # Lưu working directory hiện tại
@@ -230,7 +543,8 @@ def main():
     print("📖 Loading VnCoreNLP model...")
     vncorenlp_path = os.path.abspath("vncorenlp")
     model = py_vncorenlp.VnCoreNLP(save_dir=vncorenlp_path)
-    
+    _VNCORENLP = model
+
     # Khôi phục working directory
     os.chdir(original_cwd)
     print(f"📂 Restored working directory: {os.getcwd()}")
@@ -244,8 +558,10 @@ def main():
     
     print(f"📁 Input file: {input_file_path}")
     
-    with open(input_file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    # orjson parse nhanh hơn json chuẩn đáng kể trên file lớn
+    with open(input_file_path, 'rb') as f:
+        raw = f.read()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
     
     print(f"📊 Total samples: {len(data)}")
     
@@ -253,47 +569,75 @@ def main():
     os.makedirs("beam_output", exist_ok=True)
     
     # Xử lý samples (test với 5 samples đầu tiên)
-    results = []
     success_count = 0
     total_beam_sentences = 0
+    first_sample_result = None
     
-    for i, sample in enumerate(data[:5]):  # Test với 5 samples
-        print(f"\n📝 Processing sample {i+1}/5...")
-        
-        result, success = process_sample_with_beam_search(sample, model)
-        
-        if success and result:
-            results.append(result)
-            success_count += 1
-            
-            beam_count = len(result.get("beam_evidence", []))
-            total_beam_sentences += beam_count
-            
-            print(f"✅ Sample {i+1}: Found {beam_count} sentences")
-            # Show first 3 sentences
-            for j, sentence in enumerate(result["beam_evidence"][:3], 1):
-                print(f"   {j}. {sentence[:100]}...")
-        else:
-            print(f"❌ Sample {i+1}: Failed to process")
-    
-    # Lưu kết quả
+    # Các sample độc lập nên có thể xử lý song song; đặt FACTCHECK_WORKERS
+    # > 1 để bật process pool (mỗi worker một JVM VnCoreNLP riêng)
+    samples = data[:5]  # Test với 5 samples
+    num_workers = int(os.environ.get("FACTCHECK_WORKERS", "1"))
+
+    executor = None
+    if num_workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        print(f"🧵 Using {num_workers} worker processes (one VnCoreNLP JVM each)")
+        executor = ProcessPoolExecutor(max_workers=num_workers,
+                                       initializer=_init_worker,
+                                       initargs=(vncorenlp_path,))
+        sample_results = executor.map(_worker_process_sample, enumerate(samples))
+    else:
+        sample_results = (
+            (i, *process_sample_with_beam_search(sample, model))
+            for i, sample in enumerate(samples)
+        )
+
+    # Stream kết quả ra NDJSON ngay khi mỗi sample xong: một dòng JSON
+    # mỗi sample, memory O(1) theo dataset thay vì giữ cả list rồi dump
+    # cuối run; run dở dang vẫn còn nguyên các sample đã hoàn thành
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = f"beam_output/processed_with_improved_entities_{timestamp}.json"
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
-    
+    output_file = f"beam_output/processed_with_improved_entities_{timestamp}.ndjson"
+
+    with open(output_file, 'ab') as out_f:
+        for i, result, success in sample_results:
+            print(f"\n📝 Processing sample {i+1}/{len(samples)}...")
+
+            if success and result:
+                if orjson is not None:
+                    out_f.write(orjson.dumps(result))
+                else:
+                    out_f.write(json.dumps(result, ensure_ascii=False).encode("utf-8"))
+                out_f.write(b"\n")
+
+                if first_sample_result is None:
+                    first_sample_result = result
+                success_count += 1
+
+                beam_count = len(result.get("beam_evidence", []))
+                total_beam_sentences += beam_count
+
+                print(f"✅ Sample {i+1}: Found {beam_count} sentences")
+                # Show first 3 sentences
+                for j, sentence in enumerate(result["beam_evidence"][:3], 1):
+                    print(f"   {j}. {sentence[:100]}...")
+            else:
+                print(f"❌ Sample {i+1}: Failed to process")
+
+    if executor is not None:
+        executor.shutdown()
+
+
     # In thống kê
     print(f"\n🎉 Processing completed!")
     print(f"📁 Results saved to: {output_file}")
-    print(f"📊 Success rate: {success_count}/{len(data[:5])} ({success_count/5*100:.1f}%)")
+    print(f"📊 Success rate: {success_count}/{len(samples)} ({success_count/len(samples)*100:.1f}%)")
     print(f"📈 Statistics:")
     print(f"   - Total beam sentences found: {total_beam_sentences}")
     print(f"   - Average sentences per sample: {total_beam_sentences/max(success_count,1):.1f}")
     
-    if success_count > 0:
+    if first_sample_result is not None:
         print(f"\n📋 Sample result:")
-        sample_result = results[0]
+        sample_result = first_sample_result
         print(f"   Claim: {sample_result['claim'][:100]}...")
         print(f"   Beam evidence found: {len(sample_result['beam_evidence'])} sentences")
         for i, sentence in enumerate(sample_result["beam_evidence"][:2], 1):
@@ -57,6 +57,21 @@ def get_version():
         pass
     return version
 
+# Biên dịch AOT các module nóng (beam search, helpers) bằng Cython ở chế
+# độ pure-Python. Chỉ bật khi đặt MINT_BUILD_EXT=1: bước dịch C -> .so
+# chạy về sau trong build_ext nên không thể try/except ở đây — máy có
+# Cython nhưng thiếu C compiler sẽ fail cả pip install nếu bật mặc định.
+# Không bật thì ext_modules rỗng và bản .py thuần chạy y nguyên.
+def build_ext_modules():
+    """Cythonize hot modules khi được yêu cầu qua MINT_BUILD_EXT=1"""
+    if os.environ.get("MINT_BUILD_EXT") != "1":
+        return []
+    from Cython.Build import cythonize
+    return cythonize(
+        ["mint/beam_search.py", "mint/helpers.py"],
+        language_level=3,
+    )
+
 setup(
     name="mint-textgraph",
     version=get_version(),
@@ -86,6 +101,7 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=read_requirements(),
+    ext_modules=build_ext_modules(),
     extras_require={
         "dev": [
             "pytest>=6.0",
@@ -98,6 +114,13 @@ setup(
             "faiss-gpu",  # For GPU acceleration
             "torch-audio",  # Additional torch components
         ],
+        "speed": [
+            "pyahocorasick",  # Multi-pattern entity matching
+            "orjson",  # Fast JSON parsing
+            "numba",  # JIT-compiled numeric kernels
+            "rapidfuzz",  # C-accelerated fuzzy matching
+            "diskcache",  # On-disk VnCoreNLP annotation cache
+        ],
         "all": [
             "pytest>=6.0",
             "pytest-cov>=2.0", 